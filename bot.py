@@ -1,20 +1,29 @@
 #!/usr/bin/env python3
 import os
+import asyncio
 import signal
 import sys
+import atexit
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from telegram_bot import TradingBot
 from config import Config
 
-# 設定日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log')
-    ]
-)
+# 設定日誌：事件迴圈只把記錄放進佇列，由背景執行緒負責寫入終端與檔案
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+stream_handler = logging.StreamHandler(sys.stdout)
+file_handler = logging.FileHandler('bot.log', delay=True)
+stream_handler.setFormatter(log_formatter)
+file_handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, stream_handler, file_handler)
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.addHandler(QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logger = logging.getLogger(__name__)
 
@@ -35,16 +44,21 @@ def main():
         config = Config()
         logger.info("✅ 配置驗證成功")
         
+        # 非 Windows 平台改用 uvloop 事件迴圈，run_polling 會沿用目前設定的迴圈
+        if sys.platform != 'win32':
+            import uvloop
+            asyncio.set_event_loop(uvloop.new_event_loop())
+        
         # 啟動 Telegram 機器人
         logger.info("🤖 啟動 Gate.io 自動滾倉交易機器人...")
         bot = TradingBot()
         bot.run()
         
     except ValueError as e:
-        logger.error(f"❌ 配置錯誤: {str(e)}")
+        logger.error("❌ 配置錯誤: %s", e)
         sys.exit(1)
     except Exception as e:
-        logger.error(f"❌ 啟動失敗: {str(e)}")
+        logger.error("❌ 啟動失敗: %s", e)
         sys.exit(1)
 
 if __name__ == "__main__":
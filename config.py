@@ -19,6 +19,35 @@ SETTLE_CURRENCY = 'usdt'  # 結算貨幣
 MAX_POSITION_SIZE = 1000  # 最大持倉金額 (USDT)
 MAX_ROLLOVER_TIMES = 10   # 最大滾倉次數
 
+# 連線配置
+API_POOL_MAXSIZE = 32     # 每個主機保持的長連線數量
+TICKER_CACHE_TTL = 0.5    # 行情快取秒數
+CONTRACT_CACHE_TTL = 600  # 合約資訊快取秒數
+API_TIMEOUT = (3, 8)      # 連線 / 讀取逾時秒數
+API_RETRIES = 1           # 連線池內的重試次數（連線錯誤、GET / DELETE 讀取錯誤與 5xx）
+API_RETRY_BACKOFF = 0.3   # 連線池重試的退避係數
+# 單次 API 呼叫總逾時秒數，涵蓋每次嘗試的連線與讀取逾時，另留 2 秒給退避等待
+API_TOTAL_TIMEOUT = (API_RETRIES + 1) * sum(API_TIMEOUT) + 2
+MAX_CONCURRENT_ORDERS = 5 # 同時送出的下單請求上限
+SDK_MAX_WORKERS = 16      # 執行 SDK 阻塞呼叫的執行緒上限
+API_MAX_CONCURRENCY = 8   # 同時進行的 API 請求上限
+API_RATE_LIMIT = 15       # 每秒 API 請求上限
+API_RATE_LIMIT_RETRIES = 3  # 被限流時的重試次數
+
+# 行情推送
+FUTURES_WS_URL = 'wss://fx-ws.gateio.ws/v4/ws/usdt'
+PRICE_FEED_HEARTBEAT = 20       # WebSocket 心跳間隔秒數
+PRICE_FEED_RECONNECT_DELAY = 3  # 斷線後重新連線等待秒數
+PRICE_FEED_MAX_AGE = 10         # 推送價格超過此秒數未更新時改用 REST
+
+# 策略保存
+STRATEGY_DB_PATH = os.getenv('STRATEGY_DB_PATH', 'strategies.db')
+STORE_FLUSH_INTERVAL = 0.2  # 批次寫入間隔秒數
+STATUS_POLL_INTERVAL = 2    # 背景刷新合約狀態間隔秒數
+
+# 對話配置
+SESSION_TTL = 600  # 對話閒置逾時秒數
+
 class Config:
     def __init__(self):
         self.validate_config()
@@ -1,78 +1,235 @@
+import asyncio
 import gate_api
 from gate_api import ApiClient, Configuration, FuturesOrder, FuturesApi
+from gate_api.exceptions import ApiException, GateApiException
 import hashlib
 import hmac
 import time
 import json
+import logging
+import random
+import orjson
+import numpy as np
 from datetime import datetime
-from config import GATEIO_API_KEY, GATEIO_API_SECRET, SETTLE_CURRENCY
+from urllib3.util.retry import Retry
+from price_feed import PriceFeed
+from config import (
+    GATEIO_API_KEY, GATEIO_API_SECRET, SETTLE_CURRENCY, API_POOL_MAXSIZE, TICKER_CACHE_TTL,
+    API_TIMEOUT, API_TOTAL_TIMEOUT, API_RETRIES, API_RETRY_BACKOFF, MAX_CONCURRENT_ORDERS, CONTRACT_CACHE_TTL,
+    API_MAX_CONCURRENCY, API_RATE_LIMIT, API_RATE_LIMIT_RETRIES
+)
 
-class GateIOClient:
-    def __init__(self):
-        self.config = Configuration(
+logger = logging.getLogger(__name__)
+
+# Gate.io 批次下單每次最多 10 張
+BATCH_ORDER_LIMIT = 10
+
+# 錯誤訊息中保留的回應內容長度上限
+ERROR_BODY_LIMIT = 512
+
+# 無請求內容時的 SHA-512 摘要固定不變，GET 請求直接使用
+_EMPTY_SHA512_HEX = hashlib.sha512(b"").hexdigest()
+
+class GateApiClient(ApiClient):
+    """重用簽名用 HMAC 物件的 ApiClient"""
+    def __init__(self, configuration):
+        super().__init__(configuration)
+        # 金鑰只在這裡展開一次，每次簽名複製即可
+        self._hmac_template = hmac.new(configuration.secret.encode('utf-8'), digestmod=hashlib.sha512)
+        self._sha512_template = hashlib.sha512()
+        self._auth_headers = {'KEY': configuration.key}
+    
+    def gen_sign(self, method, url, query_string=None, body=None):
+        """產生 API v4 簽名標頭"""
+        # query_string 由 SDK 以 urlencode 依送出順序產生，與實際請求一致，不可再自行重組
+        t = str(time.time_ns() // 1_000_000_000)
+        if body is None:
+            hashed_payload = _EMPTY_SHA512_HEX
+        else:
+            if not isinstance(body, str):
+                body = json.dumps(body)
+            payload_hash = self._sha512_template.copy()
+            payload_hash.update(body.encode('utf-8'))
+            hashed_payload = payload_hash.hexdigest()
+        s = '%s\n%s\n%s\n%s\n%s' % (method, url, query_string or "", hashed_payload, t)
+        sign = self._hmac_template.copy()
+        sign.update(s.encode('utf-8'))
+        return {**self._auth_headers, 'Timestamp': t, 'SIGN': sign.hexdigest()}
+    
+    def deserialize(self, response, response_type):
+        """以 orjson 解析回應內容"""
+        if response_type == "file":
+            return super().deserialize(response, response_type)
+        # 空回應（例如部分撤單、槓桿介面）不需要解析
+        if not response.data:
+            return None
+        try:
+            data = orjson.loads(response.data)
+        except ValueError:
+            data = response.data
+        return self._ApiClient__deserialize(data, response_type)
+
+def _api_error_text(exc):
+    """把 SDK 例外轉成簡短訊息，不帶回應標頭，回應內容截斷到 ERROR_BODY_LIMIT"""
+    if isinstance(exc, GateApiException):
+        return f"{exc.label}: {exc.message}"
+    body = exc.body or b''
+    if isinstance(body, bytes):
+        body = body[:ERROR_BODY_LIMIT].decode('utf-8', 'replace')
+    return f"{exc.status} {exc.reason} - {body[:ERROR_BODY_LIMIT]}"
+
+class TokenBucket:
+    """令牌桶，限制每秒送出的請求數"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """取得一個令牌，不足時等待補充"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+_shared_api_client = None
+
+def get_shared_api_client():
+    """取得全域共用的 ApiClient，整個程序只建立一個 urllib3 連線池"""
+    global _shared_api_client
+    if _shared_api_client is None:
+        config = Configuration(
             key=GATEIO_API_KEY,
             secret=GATEIO_API_SECRET,
             host="https://api.gateio.ws/api/v4"
         )
-        self.api_client = ApiClient(self.config)
+        config.connection_pool_maxsize = API_POOL_MAXSIZE
+        # 連線失敗時請求尚未送出，所有方法都可重試；讀取錯誤與 5xx 只對 GET / DELETE 重試，POST 下單不會重複送出
+        # 重試用盡時回傳最後的回應，由 SDK 轉成 ApiException
+        # 不依 Retry-After 等待，最壞情況的耗時才能落在 API_TOTAL_TIMEOUT 內
+        config.retries = Retry(
+            total=API_RETRIES, backoff_factor=API_RETRY_BACKOFF,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'DELETE']),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        _shared_api_client = GateApiClient(config)
+    return _shared_api_client
+
+class GateIOClient:
+    def __init__(self):
+        self.api_client = get_shared_api_client()
+        self.config = self.api_client.configuration
         self.futures_api = FuturesApi(self.api_client)
+        # 行情快取: symbol -> (建立時間, 查詢任務)
+        self._ticker_cache = {}
+        # 合約資訊快取: 結算貨幣 -> (建立時間, 全部合約查詢任務)
+        self._contract_cache = {}
+        # WebSocket 行情，由機器人啟動時開始接收
+        self.price_feed = PriceFeed()
+        # 限制同時進行的請求數與每秒請求數，避免觸發交易所限流
+        self._request_semaphore = asyncio.Semaphore(API_MAX_CONCURRENCY)
+        self._rate_limiter = TokenBucket(API_RATE_LIMIT, API_RATE_LIMIT)
+    
+    def close(self):
+        """關閉連線池"""
+        self.api_client.rest_client.pool_manager.clear()
+        self.api_client.close()
+    
+    async def _call(self, func, **kwargs):
+        """在工作執行緒中呼叫阻塞的 SDK 方法，避免卡住事件迴圈；被限流時等待後重試"""
+        for attempt in range(API_RATE_LIMIT_RETRIES + 1):
+            async with self._request_semaphore:
+                await self._rate_limiter.acquire()
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.to_thread(func, settle=SETTLE_CURRENCY, _request_timeout=API_TIMEOUT, **kwargs),
+                        timeout=API_TOTAL_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    raise TimeoutError("Gate.io 請求逾時")
+                except GateApiException as e:
+                    # 被限流的請求不會被交易所受理，可以安全重試
+                    if e.label != 'TOO_MANY_REQUESTS' or attempt == API_RATE_LIMIT_RETRIES:
+                        raise Exception(_api_error_text(e)) from e
+                    delay = self._retry_after(e, attempt)
+                except ApiException as e:
+                    raise Exception(_api_error_text(e)) from e
+            # 等待時釋放併發名額
+            logger.warning("Gate.io 限流，%.2f 秒後重試 (%d/%d)", delay, attempt + 1, API_RATE_LIMIT_RETRIES)
+            await asyncio.sleep(delay)
     
-    def get_ticker_price(self, symbol):
-        """獲取當前價格"""
+    @staticmethod
+    def _retry_after(exc, attempt):
+        """依 Retry-After 標頭決定重試等待秒數，沒有時指數退避，並加上隨機抖動"""
         try:
-            tickers = self.futures_api.list_futures_tickers(settle=SETTLE_CURRENCY, contract=symbol)
+            delay = float(exc.headers.get('Retry-After'))
+        except (AttributeError, TypeError, ValueError):
+            delay = 0.5 * 2 ** attempt
+        return delay + random.uniform(0, 0.1)
+    
+    async def get_ticker_price(self, symbol):
+        """獲取當前價格，優先讀取 WebSocket 推送的最新價"""
+        price = self.price_feed.price(symbol)
+        if price is not None:
+            return price
+        # 尚未收到推送（剛訂閱、斷線中或價格過舊）時改用 REST，短時間內的重複查詢共用同一個請求
+        await self.price_feed.subscribe(symbol)
+        return await self._single_flight(
+            self._ticker_cache, symbol, TICKER_CACHE_TTL, lambda: self._fetch_ticker_price(symbol)
+        )
+    
+    @staticmethod
+    async def _single_flight(cache, key, ttl, fetch):
+        """快取查詢任務，TTL 內的查詢（包含進行中的請求）共用同一個結果"""
+        now = time.monotonic()
+        cached = cache.get(key)
+        if cached and now - cached[0] < ttl:
+            return await asyncio.shield(cached[1])
+        
+        task = asyncio.create_task(fetch())
+        cache[key] = (now, task)
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            # 失敗的結果不保留，下一次查詢重新請求
+            if cache.get(key, (None, None))[1] is task:
+                del cache[key]
+            raise
+    
+    async def _fetch_ticker_price(self, symbol):
+        """向交易所查詢當前價格"""
+        try:
+            tickers = await self._call(self.futures_api.list_futures_tickers, contract=symbol)
             if tickers:
                 return float(tickers[0].last)
             return None
         except Exception as e:
             raise Exception(f"獲取價格失敗: {str(e)}")
     
-    def get_account_balance(self):
+    async def get_account_balance(self):
         """獲取帳戶餘額"""
         try:
-            # 調試：先打印返回的對象類型
-            account_data = self.futures_api.list_futures_accounts(settle=SETTLE_CURRENCY)
-            print(f"Account data type: {type(account_data)}")
-            print(f"Account data: {account_data}")
-            
-            # 根據實際返回的數據結構進行處理
-            if hasattr(account_data, 'total'):
-                # 如果是單一對象且有total屬性
-                return float(account_data.total)
-            elif isinstance(account_data, list) and len(account_data) > 0:
-                # 如果是列表
-                if hasattr(account_data[0], 'total'):
-                    return float(account_data[0].total)
-                else:
-                    # 嘗試其他可能的屬性名
-                    for attr in ['available', 'balance', 'total_balance']:
-                        if hasattr(account_data[0], attr):
-                            return float(getattr(account_data[0], attr))
-            else:
-                # 嘗試直接訪問可能存在的屬性
-                for attr in ['total', 'available', 'balance']:
-                    if hasattr(account_data, attr):
-                        return float(getattr(account_data, attr))
-            
-            # 如果以上都不行，嘗試轉換為字典
-            if hasattr(account_data, '__dict__'):
-                account_dict = account_data.__dict__
-                for key in ['total', 'available', 'balance', 'total_balance']:
-                    if key in account_dict:
-                        return float(account_dict[key])
-            
-            return 0.0
-            
+            # list_futures_accounts 回傳單一 FuturesAccount
+            account = await self._call(self.futures_api.list_futures_accounts)
+            return float(account.total)
         except Exception as e:
-            print(f"Error details: {str(e)}")
             raise Exception(f"獲取餘額失敗: {str(e)}")
     
-    def set_leverage(self, symbol, leverage):
+    async def set_leverage(self, symbol, leverage):
         """設定槓桿"""
         try:
             leverage_str = f"{leverage}"
-            result = self.futures_api.update_position_leverage(
-                settle=SETTLE_CURRENCY,
+            result = await self._call(
+                self.futures_api.update_position_leverage,
                 contract=symbol,
                 leverage=leverage_str
             )
@@ -80,20 +237,47 @@ class GateIOClient:
         except Exception as e:
             raise Exception(f"設定槓桿失敗: {str(e)}")
     
-    def calculate_position_size(self, symbol, margin, leverage, price):
-        """計算可開倉數量"""
+    async def _get_contract(self, symbol):
+        """獲取合約資訊"""
+        contracts = await self._get_contracts()
+        contract = contracts.get(symbol)
+        if contract is None:
+            # 快取建立後才上架的合約單獨查詢
+            contract = await self._call(self.futures_api.get_futures_contract, contract=symbol)
+        return contract
+    
+    async def _get_contracts(self):
+        """獲取全部合約資訊，合約參數極少變動，整批載入後快取 CONTRACT_CACHE_TTL 秒"""
+        return await self._single_flight(
+            self._contract_cache, SETTLE_CURRENCY, CONTRACT_CACHE_TTL, self._fetch_contracts
+        )
+    
+    async def warm_up(self):
+        """預先載入合約資訊並建立連線，失敗時只記錄，第一次使用時會再查詢"""
+        try:
+            await self._get_contracts()
+        except Exception as e:
+            logger.warning("預先載入合約資訊失敗: %s", e)
+    
+    async def _fetch_contracts(self):
+        """一次下載全部合約資訊，建立 symbol -> 合約 對照表"""
+        contracts = await self._call(self.futures_api.list_futures_contracts)
+        return {contract.name: contract for contract in contracts}
+    
+    async def get_contract_size(self, symbol):
+        """獲取每張合約對應的幣數"""
         try:
             # 獲取合約資訊
-            contract = self.futures_api.get_futures_contract(settle=SETTLE_CURRENCY, contract=symbol)
+            contract = await self._get_contract(symbol)
             
             # 計算合約價值
-            if hasattr(contract, 'quanto_multiplier') and contract.quanto_multiplier:
-                contract_size = float(contract.quanto_multiplier)
-            elif hasattr(contract, 'size') and contract.size:
-                contract_size = float(contract.size)
-            else:
-                contract_size = 1.0
-            
+            return float(getattr(contract, 'quanto_multiplier', None) or getattr(contract, 'size', None) or 1)
+        except Exception as e:
+            raise Exception(f"獲取合約資訊失敗: {str(e)}")
+    
+    def calculate_position_size(self, margin, leverage, price, contract_size):
+        """計算可開倉數量"""
+        try:
             # 計算可開倉張數
             total_value = margin * leverage
             position_size = total_value / price / contract_size
@@ -102,58 +286,84 @@ class GateIOClient:
         except Exception as e:
             raise Exception(f"計算倉位大小失敗: {str(e)}")
     
-    def place_market_order(self, symbol, size, side='long'):
+    def build_market_order(self, symbol, size, side='long'):
+        """建立市價單"""
+        return FuturesOrder(
+            contract=symbol,
+            size=size,
+            price='0',  # 市價單價格設為0
+            side='buy' if side == 'long' else 'sell',
+            time_in_force='ioc'
+        )
+    
+    async def place_market_order(self, symbol, size, side='long'):
         """下市價單"""
         try:
-            order = FuturesOrder(
-                contract=symbol,
-                size=size,
-                price='0',  # 市價單價格設為0
-                side='buy' if side == 'long' else 'sell',
-                time_in_force='ioc'
-            )
-            result = self.futures_api.create_futures_order(settle=SETTLE_CURRENCY, futures_order=order)
+            order = self.build_market_order(symbol, size, side)
+            result = await self._call(self.futures_api.create_futures_order, futures_order=order)
             return result
         except Exception as e:
             raise Exception(f"下單失敗: {str(e)}")
     
-    def place_limit_order(self, symbol, size, price, side='long'):
+    def build_limit_order(self, symbol, size, price, side='long'):
+        """建立限價單"""
+        return FuturesOrder(
+            contract=symbol,
+            size=size,
+            price=str(price),
+            side='buy' if side == 'long' else 'sell',
+            time_in_force='gtc'  # 一直有效直到取消
+        )
+    
+    async def place_limit_order(self, symbol, size, price, side='long'):
         """下限價單"""
         try:
-            order = FuturesOrder(
-                contract=symbol,
-                size=size,
-                price=str(price),
-                side='buy' if side == 'long' else 'sell',
-                time_in_force='gtc'  # 一直有效直到取消
-            )
-            result = self.futures_api.create_futures_order(settle=SETTLE_CURRENCY, futures_order=order)
+            order = self.build_limit_order(symbol, size, price, side)
+            result = await self._call(self.futures_api.create_futures_order, futures_order=order)
             return result
         except Exception as e:
             raise Exception(f"下限價單失敗: {str(e)}")
     
-    def place_conditional_order(self, symbol, size, trigger_price, side='long'):
+    def build_conditional_order(self, symbol, size, trigger_price, side='long'):
+        """建立條件單"""
+        # 使用止盈止損單來實現條件單功能
+        return FuturesOrder(
+            contract=symbol,
+            size=size,
+            price='0',  # 市價單
+            side='buy' if side == 'long' else 'sell',
+            time_in_force='ioc',
+            stop_trigger=str(trigger_price)
+        )
+    
+    async def place_conditional_order(self, symbol, size, trigger_price, side='long'):
         """下條件單"""
         try:
-            # 使用止盈止損單來實現條件單功能
-            order = FuturesOrder(
-                contract=symbol,
-                size=size,
-                price='0',  # 市價單
-                side='buy' if side == 'long' else 'sell',
-                time_in_force='ioc',
-                stop_trigger=str(trigger_price)
-            )
-            result = self.futures_api.create_futures_order(settle=SETTLE_CURRENCY, futures_order=order)
+            order = self.build_conditional_order(symbol, size, trigger_price, side)
+            result = await self._call(self.futures_api.create_futures_order, futures_order=order)
             return result
         except Exception as e:
             raise Exception(f"下條件單失敗: {str(e)}")
     
-    def get_open_orders(self, symbol):
+    async def place_batch_orders(self, orders):
+        """批次下單，一次最多 BATCH_ORDER_LIMIT 張，回傳結果與請求順序一致"""
+        try:
+            return await self._call(self.futures_api.create_batch_futures_order, futures_order=orders)
+        except Exception as e:
+            raise Exception(f"批次下單失敗: {str(e)}")
+    
+    async def get_position(self, symbol):
+        """獲取持倉"""
+        try:
+            return await self._call(self.futures_api.get_position, contract=symbol)
+        except Exception as e:
+            raise Exception(f"獲取持倉失敗: {str(e)}")
+    
+    async def get_open_orders(self, symbol):
         """獲取未成交訂單"""
         try:
-            orders = self.futures_api.list_futures_orders(
-                settle=SETTLE_CURRENCY, 
+            orders = await self._call(
+                self.futures_api.list_futures_orders,
                 contract=symbol,
                 status='open'
             )
@@ -161,82 +371,174 @@ class GateIOClient:
         except Exception as e:
             raise Exception(f"獲取訂單失敗: {str(e)}")
     
-    def cancel_all_orders(self, symbol):
+    async def cancel_all_orders(self, symbol):
         """取消所有訂單"""
         try:
-            result = self.futures_api.cancel_futures_orders(
-                settle=SETTLE_CURRENCY,
+            result = await self._call(
+                self.futures_api.cancel_futures_orders,
                 contract=symbol
             )
             return True
         except Exception as e:
             raise Exception(f"取消訂單失敗: {str(e)}")
+    
+    async def cancel_order(self, order_id):
+        """取消單一訂單"""
+        try:
+            await self._call(self.futures_api.cancel_futures_order, order_id=str(order_id))
+            return True
+        except Exception as e:
+            raise Exception(f"取消訂單失敗: {str(e)}")
 
 class TradingStrategy:
     def __init__(self, gateio_client):
         self.client = gateio_client
+        # 限制同時送出的下單請求數量，避免觸發交易所限流
+        self._order_semaphore = asyncio.Semaphore(MAX_CONCURRENT_ORDERS)
     
     def calculate_rollover_prices(self, entry_price, rollover_times, percentage_increase):
-        """計算滾倉觸發價格"""
-        prices = []
-        current_price = entry_price
+        """計算滾倉觸發價格，回傳 NumPy 陣列"""
+        # 第 n 次滾倉價格 = 進場價 × (1 + 漲幅)^n，一次算出整組價格
+        factors = (1 + percentage_increase / 100) ** np.arange(1, rollover_times + 1)
+        return np.round(entry_price * factors, 2)
+    
+    async def _place_batch(self, orders):
+        """在併發上限內以一次批次請求送出一組訂單"""
+        async with self._order_semaphore:
+            return await self.client.place_batch_orders(orders)
+    
+    @staticmethod
+    def _order_error(result):
+        """批次下單的單張結果失敗時回傳錯誤訊息，成功回傳 None"""
+        if isinstance(result, Exception):
+            return str(result)
+        if not result.succeeded:
+            return f"{result.label} {result.detail or ''}".strip()
+        return None
+    
+    async def _abort_rollovers(self, symbol, order_result, entry_error, results):
+        """進場單未成功時撤回已掛出的滾倉單，回傳給用戶的失敗說明"""
+        placed = [cond_order.id for cond_order in results if self._order_error(cond_order) is None]
+        cancel_results = await asyncio.gather(
+            *(self.client.cancel_order(order_id) for order_id in placed),
+            return_exceptions=True
+        )
+        uncancelled = [order_id for order_id, result in zip(placed, cancel_results) if isinstance(result, Exception)]
         
-        for i in range(rollover_times):
-            current_price = current_price * (1 + percentage_increase / 100)
-            prices.append(round(current_price, 2))
+        if isinstance(order_result, Exception):
+            # 整批請求失敗（例如逾時）時工作執行緒可能已送出請求，進場單與同批滾倉單的狀態都不確定
+            logger.error("%s 進場單狀態未知: %s", symbol, entry_error)
+            message = f"進場單狀態未知，請到交易所確認持倉與掛單: {entry_error}"
+        else:
+            message = f"進場單失敗: {entry_error}"
         
-        return prices
+        if uncancelled:
+            logger.error("%s 滾倉單撤回失敗，仍在掛單: %s", symbol, uncancelled)
+            message += f"\n⚠️ 以下滾倉單撤回失敗，請手動取消: {', '.join(map(str, uncancelled))}"
+        else:
+            logger.warning("%s 進場單未成功，已撤回 %d 張滾倉單: %s", symbol, len(placed), entry_error)
+        return message
     
-    def execute_strategy(self, symbol, entry_type, leverage, margin, rollover_times, percentage_increase, entry_price=None):
+    async def execute_strategy(self, symbol, entry_type, leverage, margin, rollover_times, percentage_increase, entry_price=None):
         """執行交易策略"""
         try:
-            # 獲取當前價格
-            current_price = self.client.get_ticker_price(symbol)
+            if entry_type == 'limit' and not entry_price:
+                return False, "掛單需要指定進場價格"
+            
+            # 價格與合約資訊互不依賴，同時請求
+            current_price, contract_size = await asyncio.gather(
+                self.client.get_ticker_price(symbol),
+                self.client.get_contract_size(symbol)
+            )
             if not current_price:
                 return False, "無法獲取當前價格"
             
-            # 設定槓桿
-            self.client.set_leverage(symbol, leverage)
+            # 槓桿會修改帳戶設定，等查詢都成功後才送出
+            await self.client.set_leverage(symbol, leverage)
             
             # 計算開倉數量
             if entry_type == 'market':
                 entry_price = current_price
             
-            position_size = self.client.calculate_position_size(symbol, margin, leverage, entry_price)
+            position_size = self.client.calculate_position_size(margin, leverage, entry_price, contract_size)
             
             if position_size <= 0:
                 return False, "計算的倉位大小為0"
             
-            # 下進場單
-            if entry_type == 'market':
-                order_result = self.client.place_market_order(symbol, position_size, 'long')
-            else:
-                if not entry_price:
-                    return False, "掛單需要指定進場價格"
-                order_result = self.client.place_limit_order(symbol, position_size, entry_price, 'long')
-            
             # 計算滾倉價格
             rollover_prices = self.calculate_rollover_prices(
-                entry_price if entry_type == 'limit' else current_price,
+                entry_price,
                 rollover_times,
                 percentage_increase
             )
             
-            # 下滾倉條件單
+            # 進場單排在第一批最前面，與滾倉條件單一起以批次請求送出，單張失敗不影響其他訂單
+            if entry_type == 'market':
+                entry_order = self.client.build_market_order(symbol, position_size, 'long')
+            else:
+                entry_order = self.client.build_limit_order(symbol, position_size, entry_price, 'long')
+            
+            # 價格只在組裝訂單時一次性轉成字串
+            trigger_prices = np.char.mod('%.2f', rollover_prices).tolist()
+            orders = [entry_order] + [
+                self.client.build_conditional_order(symbol, position_size, trigger_price, 'long')
+                for trigger_price in trigger_prices
+            ]
+            batches = [orders[i:i + BATCH_ORDER_LIMIT] for i in range(0, len(orders), BATCH_ORDER_LIMIT)]
+            batch_results = await asyncio.gather(
+                *(self._place_batch(batch) for batch in batches),
+                return_exceptions=True
+            )
+            
+            # 展開成逐張結果，整批請求失敗時該批每張都記為同一個例外
+            results = []
+            for batch, batch_result in zip(batches, batch_results):
+                if isinstance(batch_result, Exception):
+                    results.extend([batch_result] * len(batch))
+                else:
+                    results.extend(batch_result)
+            order_result, *results = results
+            
+            # 進場失敗時撤回已掛出的滾倉單
+            entry_error = self._order_error(order_result)
+            if entry_error:
+                return False, await self._abort_rollovers(symbol, order_result, entry_error, results)
+            
+            logger.info("%s 進場單 %s 已送出，倉位 %d 張", symbol, order_result.id, position_size)
+            
             rollover_orders = []
-            for i, trigger_price in enumerate(rollover_prices):
-                cond_order = self.client.place_conditional_order(
-                    symbol, position_size, trigger_price, 'long'
-                )
-                rollover_orders.append({
-                    'order_id': cond_order.id,
-                    'trigger_price': trigger_price,
-                    'size': position_size
-                })
+            for trigger_price, cond_order in zip(rollover_prices.tolist(), results):
+                error = self._order_error(cond_order)
+                if isinstance(cond_order, Exception):
+                    # 整批請求失敗（例如逾時）時請求可能已送達交易所，不能當作未掛出
+                    logger.error("%s 滾倉單狀態未知，觸發價 %s: %s", symbol, trigger_price, error)
+                    rollover_orders.append({
+                        'order_id': None,
+                        'trigger_price': trigger_price,
+                        'size': position_size,
+                        'status': 'unknown',
+                        'error': error
+                    })
+                elif error:
+                    logger.warning("%s 滾倉單失敗，觸發價 %s: %s", symbol, trigger_price, error)
+                    rollover_orders.append({
+                        'order_id': None,
+                        'trigger_price': trigger_price,
+                        'size': position_size,
+                        'status': 'failed',
+                        'error': error
+                    })
+                else:
+                    rollover_orders.append({
+                        'order_id': cond_order.id,
+                        'trigger_price': trigger_price,
+                        'size': position_size,
+                        'status': 'open'
+                    })
             
             return True, {
                 'entry_order': order_result.id,
-                'entry_price': entry_price if entry_type == 'limit' else current_price,
+                'entry_price': entry_price,
                 'position_size': position_size,
                 'rollover_orders': rollover_orders
             }
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+import aiohttp
+import orjson
+from config import FUTURES_WS_URL, PRICE_FEED_HEARTBEAT, PRICE_FEED_RECONNECT_DELAY, PRICE_FEED_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+class PriceFeed:
+    """以 WebSocket 訂閱合約行情，最新價格保存在記憶體中"""
+    def __init__(self, url=FUTURES_WS_URL):
+        self.url = url
+        # symbol -> (最新成交價, 收到時間)，斷線時清空，讀取端改用 REST
+        self.last = {}
+        self._symbols = set()
+        self._ws = None
+        self._task = None
+
+    def price(self, symbol):
+        """回傳 PRICE_FEED_MAX_AGE 秒內推送的最新價格，沒有或過舊時回傳 None"""
+        entry = self.last.get(symbol)
+        if entry is None or time.monotonic() - entry[1] > PRICE_FEED_MAX_AGE:
+            return None
+        return entry[0]
+
+    def start(self):
+        """啟動背景接收任務（需在事件迴圈中呼叫）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def subscribe(self, symbol):
+        """訂閱合約行情，已訂閱則不重複送出；送出失敗時不記錄訂閱，下次查詢重新送出"""
+        if symbol in self._symbols:
+            return
+        self._symbols.add(symbol)
+        if not await self._send('subscribe', [symbol]):
+            self._symbols.discard(symbol)
+
+    async def unsubscribe(self, symbol):
+        """取消訂閱合約行情"""
+        if symbol not in self._symbols:
+            return
+        self._symbols.discard(symbol)
+        self.last.pop(symbol, None)
+        await self._send('unsubscribe', [symbol])
+
+    async def close(self):
+        """停止接收任務並關閉連線"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.last.clear()
+
+    async def _send(self, event, symbols):
+        """送出訂閱變更，只記錄失敗不拋出，讀取端仍可改用 REST；送出失敗時回傳 False"""
+        # 尚未連線時只記下訂閱，連線建立後統一送出
+        if self._ws is None or self._ws.closed:
+            return True
+        try:
+            await self._ws.send_bytes(orjson.dumps({
+                'time': int(time.time()),
+                'channel': 'futures.tickers',
+                'event': event,
+                'payload': symbols
+            }))
+            return True
+        except Exception as e:
+            # 連線可能正在關閉，closed 檢查無法避免這個競爭
+            logger.warning("行情訂閱變更送出失敗 (%s %s): %s", event, symbols, e)
+            return False
+
+    async def _run(self):
+        """接收行情推送，斷線後重新連線並恢復訂閱"""
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=PRICE_FEED_HEARTBEAT) as ws:
+                        self._ws = ws
+                        if self._symbols:
+                            await self._send('subscribe', list(self._symbols))
+                        async for msg in ws:
+                            if msg.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                                continue
+                            data = orjson.loads(msg.data)
+                            if data.get('channel') != 'futures.tickers' or data.get('event') != 'update':
+                                continue
+                            now = time.monotonic()
+                            for ticker in data['result']:
+                                # 取消訂閱前已送出的推送不再保存，避免留下不會更新的價格
+                                if ticker['contract'] in self._symbols:
+                                    self.last[ticker['contract']] = (float(ticker['last']), now)
+                except Exception as e:
+                    logger.warning("行情連線中斷: %s", e)
+                finally:
+                    self._ws = None
+                    self.last.clear()
+                await asyncio.sleep(PRICE_FEED_RECONNECT_DELAY)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from config import STRATEGY_DB_PATH, STORE_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# 放入佇列通知背景任務寫完剩餘資料後結束
+_STOP = object()
+
+class StrategyStore:
+    """以 SQLite 保存執行中的策略，寫入先進佇列再由背景任務批次落盤"""
+    def __init__(self, path=STRATEGY_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS strategies ("
+            "entry_order TEXT PRIMARY KEY, symbol TEXT NOT NULL, "
+            "created_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._write_lock = threading.Lock()
+        self._queue = asyncio.Queue()
+        self._flusher = None
+
+    def load_all(self):
+        """載入所有已保存的策略"""
+        rows = self._conn.execute("SELECT data FROM strategies ORDER BY created_at").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def start(self):
+        """啟動背景寫入任務（需在事件迴圈中呼叫）"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def put(self, strategy):
+        """排入一筆待寫入的策略，不等待落盤"""
+        self._queue.put_nowait(('put', strategy))
+
+    def remove(self, entry_order):
+        """排入刪除已結束的策略，與寫入依序處理"""
+        self._queue.put_nowait(('delete', str(entry_order)))
+
+    async def close(self):
+        """等背景任務寫完剩餘資料後關閉資料庫"""
+        if self._flusher is not None:
+            # 不取消背景任務，避免寫入進行到一半時資料遺失
+            self._queue.put_nowait(_STOP)
+            await self._flusher
+            self._flusher = None
+        else:
+            batch, _ = self._drain([])
+            if batch:
+                await asyncio.to_thread(self._write, batch)
+        with self._write_lock:
+            self._conn.close()
+
+    async def _flush_loop(self):
+        """等待第一筆資料後再收集一個間隔內的所有寫入，合併成一次交易"""
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                batch, _ = self._drain([])
+                stop = True
+            else:
+                await asyncio.sleep(STORE_FLUSH_INTERVAL)
+                batch, stop = self._drain([item])
+            if batch:
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                except Exception as e:
+                    logger.error("策略寫入失敗 (%d 筆): %s", len(batch), e)
+            if stop:
+                return
+
+    def _drain(self, batch):
+        """取出佇列中所有資料，回傳 (資料, 是否收到停止通知)"""
+        stop = False
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)
+        return batch, stop
+
+    def _write(self, batch):
+        """在同一個交易中依序套用寫入與刪除"""
+        with self._write_lock, self._conn:
+            for op, value in batch:
+                if op == 'put':
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO strategies (entry_order, symbol, created_at, data) VALUES (?, ?, ?, ?)",
+                        (str(value['entry_order']), value['symbol'], value['created_at'], json.dumps(value))
+                    )
+                else:
+                    self._conn.execute("DELETE FROM strategies WHERE entry_order = ?", (value,))
@@ -1,21 +1,97 @@
 from telegram import Update, ReplyKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from telegram.constants import MessageLimit
+from telegram.ext import (
+    Application, CommandHandler, ConversationHandler, MessageHandler, TypeHandler, filters, ContextTypes
+)
+import asyncio
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 from gateio_client import GateIOClient, TradingStrategy
-from config import Config, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from strategy_store import StrategyStore
+from config import (
+    Config, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, STATUS_POLL_INTERVAL, SESSION_TTL,
+    SDK_MAX_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# 新建交易對話狀態
+TRADING = 0
 
-# 設定日誌
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+# 交易策略執行結果消息
+_SUCCESS_TMPL = (
+    "✅ 交易策略執行成功！\n"
+    "\n"
+    "📈 交易對: {symbol}\n"
+    "💰 保證金: {margin} USDT\n"
+    "⚡ 槓桿: {leverage}x\n"
+    "🎯 進場方式: {entry_type}\n"
+    "🔄 滾倉次數: {rollover_times}次\n"
+    "📊 每次漲幅: {percentage_increase}%\n"
+    "\n"
+    "📋 訂單詳情:\n"
+    "- 進場訂單 ID: {entry_order}\n"
+    "- 倉位大小: {position_size}張\n"
+    "\n"
+    "🔔 滾倉條件單已建立:\n"
+    "{orders}"
 )
+_ORDER_LINE = "{n}. 觸發價: {trigger_price} | 張數: {size}"
+_FAILED_ORDER_LINE = "{n}. ❌ 觸發價: {trigger_price} | 失敗: {error}"
+_UNKNOWN_ORDER_LINE = "{n}. ⚠️ 觸發價: {trigger_price} | 狀態未知: {error}"
+_UNKNOWN_ORDERS_NOTE = "\n\n⚠️ 部分滾倉單狀態未知，請到交易所確認掛單"
+_ORDER_LINES = {'failed': _FAILED_ORDER_LINE, 'unknown': _UNKNOWN_ORDER_LINE}
+
+# USDT 永續合約代號，接受 BTC_USDT、BTC/USDT、btcusdt 等寫法
+_SYMBOL_RE = re.compile(r'([A-Z0-9]{1,20})_?USDT')
+_SYMBOL_TRANS = str.maketrans({'/': '_'})
+# 數字輸入先以正規表示式檢查，不依賴例外處理
+_INT_RE = re.compile(r'[0-9]+')
+_FLOAT_RE = re.compile(r'[0-9]+(\.[0-9]+)?')
+
+# 進場方式選項 -> (進場方式, 下一步驟, 下一步提示)
+_ENTRY_TYPES = {
+    '1': ('market', 'leverage', "請輸入槓桿倍數 (例如: 10):"),
+    '2': ('limit', 'entry_price', "請輸入掛單價格 (例如: 50000):"),
+}
+
+@dataclass(slots=True)
+class TradeSession:
+    """新建交易對話中的用戶輸入"""
+    step: str = 'symbol'
+    symbol: str = ''
+    entry_type: str = ''
+    entry_price: Optional[float] = None
+    leverage: int = 0
+    margin: float = 0.0
+    rollover_times: int = 0
+    percentage_increase: float = 0.0
 
 class TradingBot:
     def __init__(self):
         self.config = Config()
         self.gateio_client = GateIOClient()
         self.strategy = TradingStrategy(self.gateio_client)
-        self.user_sessions = {}
+        self.store = StrategyStore()
+        self.active_strategies = {str(s['entry_order']): s for s in self.store.load_all()}
+        # 每個合約一個背景刷新任務，/status 直接讀取最新快照
+        self._contract_state = {}
+        self._pollers = {}
+        self._warm_up_task = None
+        # 對話步驟 -> 處理函數
+        self._step_handlers = {
+            'symbol': self._handle_symbol,
+            'entry_type': self._handle_entry_type,
+            'entry_price': self._handle_entry_price,
+            'leverage': self._handle_leverage,
+            'margin': self._handle_margin,
+            'rollover_times': self._handle_rollover_times,
+            'percentage_increase': self._handle_percentage_increase,
+        }
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """開始命令"""
@@ -51,7 +127,7 @@ class TradingBot:
     async def check_balance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """檢查餘額"""
         try:
-            balance = self.gateio_client.get_account_balance()
+            balance = await self.gateio_client.get_account_balance()
             await update.message.reply_text(f"💰 帳戶餘額: {balance:.2f} USDT")
         except Exception as e:
             await update.message.reply_text(f"❌ 獲取餘額失敗: {str(e)}")
@@ -62,13 +138,15 @@ class TradingBot:
         
         if str(user_id) != TELEGRAM_CHAT_ID:
             await update.message.reply_text("❌ 未授權使用此機器人")
-            return
+            return ConversationHandler.END
         
-        self.user_sessions[user_id] = {'step': 'symbol'}
+        # 對話狀態保存在 PTB 的 context.user_data，不經過全域字典
+        context.user_data['session'] = TradeSession()
         
         await update.message.reply_text(
-            "📊 請輸入交易對 (例如: BTCUSDT):"
+            "📊 請輸入交易對 (例如: BTC_USDT):"
         )
+        return TRADING
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """處理用戶消息"""
@@ -76,130 +154,219 @@ class TradingBot:
         message_text = update.message.text
         
         if str(user_id) != TELEGRAM_CHAT_ID:
-            return
+            return ConversationHandler.END
+        
+        session = context.user_data.get('session')
+        handler = self._step_handlers.get(session.step) if session else None
+        if handler is None:
+            return ConversationHandler.END
         
-        if user_id not in self.user_sessions:
+        try:
+            await handler(session, message_text, update, context)
+        except Exception as e:
+            await update.message.reply_text(f"❌ 發生錯誤: {str(e)}")
+            context.user_data.pop('session', None)
+        
+        # 處理函數清除會話即代表對話結束
+        return TRADING if 'session' in context.user_data else ConversationHandler.END
+    
+    async def session_timeout(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """交易對話閒置逾時"""
+        context.user_data.pop('session', None)
+        await update.effective_chat.send_message("⌛ 交易對話已逾時，請重新輸入 /new_trade")
+    
+    async def _handle_symbol(self, session, text, update, context):
+        """輸入交易對"""
+        match = _SYMBOL_RE.fullmatch(text.strip().translate(_SYMBOL_TRANS).upper())
+        if match is None:
+            await update.message.reply_text("請輸入有效的交易對 (例如: BTC_USDT):")
+            return
+        session.symbol = f"{match[1]}_USDT"
+        session.step = 'entry_type'
+        await update.message.reply_text(
+            "請選擇進場方式:\n"
+            "1. market - 市價單\n"
+            "2. limit - 掛單\n"
+            "請輸入 1 或 2:"
+        )
+    
+    async def _handle_entry_type(self, session, text, update, context):
+        """選擇進場方式"""
+        choice = _ENTRY_TYPES.get(text.strip())
+        if choice is None:
+            await update.message.reply_text("請輸入 1 或 2:")
+            return
+        session.entry_type, session.step, prompt = choice
+        await update.message.reply_text(prompt)
+    
+    async def _handle_entry_price(self, session, text, update, context):
+        """輸入掛單價格"""
+        text = text.strip()
+        if not _FLOAT_RE.fullmatch(text):
+            await update.message.reply_text("請輸入有效的價格數字:")
+            return
+        session.entry_price = float(text)
+        session.step = 'leverage'
+        await update.message.reply_text("請輸入槓桿倍數 (例如: 10):")
+    
+    async def _handle_leverage(self, session, text, update, context):
+        """輸入槓桿倍數"""
+        text = text.strip()
+        if not _INT_RE.fullmatch(text):
+            await update.message.reply_text("請輸入有效的整數:")
+            return
+        session.leverage = int(text)
+        session.step = 'margin'
+        await update.message.reply_text("請輸入保證金金額 (USDT, 例如: 100):")
+    
+    async def _handle_margin(self, session, text, update, context):
+        """輸入保證金"""
+        text = text.strip()
+        if not _FLOAT_RE.fullmatch(text):
+            await update.message.reply_text("請輸入有效的金額數字:")
+            return
+        session.margin = float(text)
+        session.step = 'rollover_times'
+        await update.message.reply_text("請輸入滾倉次數 (例如: 5):")
+    
+    async def _handle_rollover_times(self, session, text, update, context):
+        """輸入滾倉次數"""
+        text = text.strip()
+        if not _INT_RE.fullmatch(text):
+            await update.message.reply_text("請輸入有效的整數:")
+            return
+        session.rollover_times = int(text)
+        session.step = 'percentage_increase'
+        await update.message.reply_text("請輸入每次滾倉漲幅百分比 (例如: 2):")
+    
+    async def _handle_percentage_increase(self, session, text, update, context):
+        """輸入漲幅並執行策略"""
+        text = text.strip()
+        if not _FLOAT_RE.fullmatch(text):
+            await update.message.reply_text("請輸入有效的百分比數字:")
             return
+        session.percentage_increase = float(text)
         
-        session = self.user_sessions[user_id]
+        # 執行交易策略
+        await update.message.reply_text("⏳ 正在執行交易策略...")
         
-        try:
-            if session['step'] == 'symbol':
-                session['symbol'] = message_text.upper()
-                session['step'] = 'entry_type'
-                await update.message.reply_text(
-                    "請選擇進場方式:\n"
-                    "1. market - 市價單\n"
-                    "2. limit - 掛單\n"
-                    "請輸入 1 或 2:"
-                )
-            
-            elif session['step'] == 'entry_type':
-                if message_text == '1':
-                    session['entry_type'] = 'market'
-                    session['step'] = 'leverage'
-                elif message_text == '2':
-                    session['entry_type'] = 'limit'
-                    session['step'] = 'entry_price'
-                else:
-                    await update.message.reply_text("請輸入 1 或 2:")
-                    return
-                
-                if session['entry_type'] == 'market':
-                    await update.message.reply_text("請輸入槓桿倍數 (例如: 10):")
-                else:
-                    await update.message.reply_text("請輸入掛單價格 (例如: 50000):")
-            
-            elif session['step'] == 'entry_price':
-                try:
-                    session['entry_price'] = float(message_text)
-                    session['step'] = 'leverage'
-                    await update.message.reply_text("請輸入槓桿倍數 (例如: 10):")
-                except ValueError:
-                    await update.message.reply_text("請輸入有效的價格數字:")
-            
-            elif session['step'] == 'leverage':
-                try:
-                    session['leverage'] = int(message_text)
-                    session['step'] = 'margin'
-                    await update.message.reply_text("請輸入保證金金額 (USDT, 例如: 100):")
-                except ValueError:
-                    await update.message.reply_text("請輸入有效的整數:")
-            
-            elif session['step'] == 'margin':
-                try:
-                    session['margin'] = float(message_text)
-                    session['step'] = 'rollover_times'
-                    await update.message.reply_text("請輸入滾倉次數 (例如: 5):")
-                except ValueError:
-                    await update.message.reply_text("請輸入有效的金額數字:")
+        success, result = await self.strategy.execute_strategy(
+            symbol=session.symbol,
+            entry_type=session.entry_type,
+            leverage=session.leverage,
+            margin=session.margin,
+            rollover_times=session.rollover_times,
+            percentage_increase=session.percentage_increase,
+            entry_price=session.entry_price
+        )
+        
+        if success:
+            self._record_strategy(session, result)
             
-            elif session['step'] == 'rollover_times':
-                try:
-                    session['rollover_times'] = int(message_text)
-                    session['step'] = 'percentage_increase'
-                    await update.message.reply_text("請輸入每次滾倉漲幅百分比 (例如: 2):")
-                except ValueError:
-                    await update.message.reply_text("請輸入有效的整數:")
+            # 格式化成功消息
+            orders = "\n".join(
+                _ORDER_LINES.get(order['status'], _ORDER_LINE).format(n=i, **order)
+                for i, order in enumerate(result['rollover_orders'], 1)
+            )
+            message = _SUCCESS_TMPL.format(
+                symbol=session.symbol,
+                margin=session.margin,
+                leverage=session.leverage,
+                entry_type=session.entry_type,
+                rollover_times=session.rollover_times,
+                percentage_increase=session.percentage_increase,
+                entry_order=result['entry_order'],
+                position_size=result['position_size'],
+                orders=orders
+            )
+            if any(order['status'] == 'unknown' for order in result['rollover_orders']):
+                message += _UNKNOWN_ORDERS_NOTE
             
-            elif session['step'] == 'percentage_increase':
-                try:
-                    session['percentage_increase'] = float(message_text)
-                    
-                    # 執行交易策略
-                    await update.message.reply_text("⏳ 正在執行交易策略...")
-                    
-                    success, result = self.strategy.execute_strategy(
-                        symbol=session['symbol'],
-                        entry_type=session['entry_type'],
-                        leverage=session['leverage'],
-                        margin=session['margin'],
-                        rollover_times=session['rollover_times'],
-                        percentage_increase=session['percentage_increase'],
-                        entry_price=session.get('entry_price')
-                    )
-                    
-                    if success:
-                        # 格式化成功消息
-                        message = f"""
-✅ 交易策略執行成功！
-
-📈 交易對: {session['symbol']}
-💰 保證金: {session['margin']} USDT
-⚡ 槓桿: {session['leverage']}x
-🎯 進場方式: {session['entry_type']}
-🔄 滾倉次數: {session['rollover_times']}次
-📊 每次漲幅: {session['percentage_increase']}%
-
-📋 訂單詳情:
-- 進場訂單 ID: {result['entry_order']}
-- 倉位大小: {result['position_size']}張
-
-🔔 滾倉條件單已建立:
-"""
-                        for i, order in enumerate(result['rollover_orders']):
-                            message += f"{i+1}. 觸發價: {order['trigger_price']} | 張數: {order['size']}\n"
-                        
-                        await update.message.reply_text(message)
-                    else:
-                        await update.message.reply_text(f"❌ 交易失敗: {result}")
-                    
-                    # 清除會話
-                    del self.user_sessions[user_id]
-                    
-                except ValueError:
-                    await update.message.reply_text("請輸入有效的百分比數字:")
+            await self._reply_long(update, message)
+        else:
+            await update.message.reply_text(f"❌ 交易失敗: {result}")
         
-        except Exception as e:
-            await update.message.reply_text(f"❌ 發生錯誤: {str(e)}")
-            if user_id in self.user_sessions:
-                del self.user_sessions[user_id]
+        # 清除會話
+        context.user_data.pop('session', None)
+    
+    async def _reply_long(self, update, text):
+        """回覆消息，超過 Telegram 長度上限時按行分段送出"""
+        limit = MessageLimit.MAX_TEXT_LENGTH
+        chunk = ''
+        for line in text.splitlines(keepends=True):
+            if len(chunk) + len(line) > limit and chunk:
+                await update.message.reply_text(chunk)
+                chunk = ''
+            # 單行本身過長時直接切開
+            while len(line) > limit:
+                await update.message.reply_text(line[:limit])
+                line = line[limit:]
+            chunk += line
+        if chunk:
+            await update.message.reply_text(chunk)
+    
+    def _record_strategy(self, session, result):
+        """記錄執行中的策略，並排入背景寫入"""
+        strategy = {
+            'symbol': session.symbol,
+            'entry_type': session.entry_type,
+            'leverage': session.leverage,
+            'margin': session.margin,
+            'percentage_increase': session.percentage_increase,
+            'created_at': time.time(),
+            **result
+        }
+        self.active_strategies[str(result['entry_order'])] = strategy
+        self.store.put(strategy)
+        self._ensure_poller(session.symbol)
+    
+    def _ensure_poller(self, symbol):
+        """為合約啟動背景刷新任務（同一合約只啟動一個）"""
+        if symbol not in self._pollers:
+            self._pollers[symbol] = asyncio.create_task(self._poll_contract(symbol))
+    
+    async def _poll_contract(self, symbol):
+        """定時刷新合約價格與持倉，合約上最後一筆策略結束後停止"""
+        while True:
+            # 只結束這次查詢前已存在的策略，查詢期間新建的策略留到下一輪判斷
+            known = [key for key, strategy in self.active_strategies.items() if strategy['symbol'] == symbol]
+            try:
+                price, position = await asyncio.gather(
+                    self.gateio_client.get_ticker_price(symbol),
+                    self.gateio_client.get_position(symbol)
+                )
+                self._contract_state[symbol] = {
+                    'price': price,
+                    'position_size': position.size,
+                    'unrealised_pnl': position.unrealised_pnl
+                }
+                # 沒有持倉也沒有掛單時，該合約上的策略都已結束（成交後平倉或訂單已取消）
+                if not position.size and not await self.gateio_client.get_open_orders(symbol):
+                    self._retire_strategies(symbol, known)
+                    if not any(strategy['symbol'] == symbol for strategy in self.active_strategies.values()):
+                        break
+            except Exception as e:
+                logger.warning("%s 狀態刷新失敗: %s", symbol, e)
+            await asyncio.sleep(STATUS_POLL_INTERVAL)
+        
+        # 停止刷新並取消行情訂閱，之後再有新策略時重新啟動
+        del self._pollers[symbol]
+        self._contract_state.pop(symbol, None)
+        await self.gateio_client.price_feed.unsubscribe(symbol)
+    
+    def _retire_strategies(self, symbol, keys):
+        """移除合約上已結束的策略"""
+        for key in keys:
+            self.active_strategies.pop(key, None)
+            self.store.remove(key)
+        if keys:
+            logger.info("%s 策略已結束，移除 %d 筆", symbol, len(keys))
     
     async def cancel_orders(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """取消所有訂單"""
         try:
             # 這裡需要用戶指定交易對，簡化處理
-            await update.message.reply_text("請輸入要取消訂單的交易對 (例如: BTCUSDT):")
+            await update.message.reply_text("請輸入要取消訂單的交易對 (例如: BTC_USDT):")
             context.user_data['waiting_for_symbol'] = True
         except Exception as e:
             await update.message.reply_text(f"❌ 取消訂單失敗: {str(e)}")
@@ -207,22 +374,79 @@ class TradingBot:
     async def get_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """獲取交易狀態"""
         try:
-            # 這裡可以實現獲取當前持倉和訂單狀態
-            await update.message.reply_text("📊 狀態功能開發中...")
+            if not self.active_strategies:
+                await update.message.reply_text("📊 目前沒有執行中的策略")
+                return
+            
+            lines = ["📊 執行中的策略:"]
+            for strategy in self.active_strategies.values():
+                open_orders = sum(1 for order in strategy['rollover_orders'] if order['status'] == 'open')
+                lines.append(
+                    f"\n📈 {strategy['symbol']} | 進場價: {strategy['entry_price']} | "
+                    f"倉位: {strategy['position_size']}張 | 滾倉單: {open_orders}/{len(strategy['rollover_orders'])}"
+                )
+                state = self._contract_state.get(strategy['symbol'])
+                if state:
+                    lines.append(
+                        f"   現價: {state['price']} | 持倉: {state['position_size']}張 | "
+                        f"未實現盈虧: {state['unrealised_pnl']} USDT"
+                    )
+            message = "\n".join(lines)
+            await self._reply_long(update, message)
         except Exception as e:
             await update.message.reply_text(f"❌ 獲取狀態失敗: {str(e)}")
     
+    async def startup(self, application: Application):
+        """機器人啟動後開始背景寫入策略、接收行情並刷新已有策略的合約狀態"""
+        # SDK 與 SQLite 的阻塞呼叫都經由 to_thread 進入預設執行緒池，限制其大小
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=SDK_MAX_WORKERS, thread_name_prefix='gateio')
+        )
+        self.store.start()
+        self.gateio_client.price_feed.start()
+        # 背景預先載入合約資訊，第一筆交易不必等待
+        self._warm_up_task = asyncio.create_task(self.gateio_client.warm_up())
+        for strategy in self.active_strategies.values():
+            self._ensure_poller(strategy['symbol'])
+    
+    async def shutdown(self, application: Application):
+        """機器人停止時寫入剩餘策略並關閉行情與 Gate.io 連線"""
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        for poller in self._pollers.values():
+            poller.cancel()
+        await asyncio.gather(*self._pollers.values(), return_exceptions=True)
+        self._pollers.clear()
+        await self.store.close()
+        await self.gateio_client.price_feed.close()
+        self.gateio_client.close()
+    
     def run(self):
         """啟動機器人"""
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+        application = (
+            Application.builder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .post_init(self.startup)
+            .post_shutdown(self.shutdown)
+            .build()
+        )
         
         # 添加處理器
         application.add_handler(CommandHandler("start", self.start))
         application.add_handler(CommandHandler("balance", self.check_balance))
-        application.add_handler(CommandHandler("new_trade", self.new_trade))
         application.add_handler(CommandHandler("cancel_orders", self.cancel_orders))
         application.add_handler(CommandHandler("status", self.get_status))
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
+        # 新建交易對話，閒置超過 SESSION_TTL 秒自動結束
+        application.add_handler(ConversationHandler(
+            entry_points=[CommandHandler("new_trade", self.new_trade)],
+            states={
+                TRADING: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message)],
+                ConversationHandler.TIMEOUT: [TypeHandler(Update, self.session_timeout)],
+            },
+            fallbacks=[],
+            conversation_timeout=SESSION_TTL,
+            allow_reentry=True
+        ))
         
-        # 啟動機器人
-        application.run_polling()
+        # 啟動機器人：長輪詢減少 getUpdates 次數，並丟棄離線期間累積的舊消息
+        application.run_polling(drop_pending_updates=True, timeout=30)